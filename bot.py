@@ -1,9 +1,10 @@
+import asyncio
 import logging
 import hashlib
 import time
 import os
 import sys
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 from config import *
 from market_analyzer import MarketAnalyzer
@@ -14,7 +15,7 @@ except ImportError:
     logging.error("Could not import generate_sample module. Chart generation will be disabled.")
     def create_analysis_image(*args, **kwargs):
         logging.warning("Chart generation is disabled due to missing module")
-        return False
+        return None
 from datetime import datetime
 from models import add_user, get_user, approve_user, verify_user_password, update_user_language
 from keep_alive import keep_alive
@@ -247,6 +248,11 @@ async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
         try:
+            # Warm the cache for the other pairs in a worker thread, without blocking the event loop;
+            # later clicks within the TTL are then served without a yfinance round trip
+            other_symbols = [s for s in CURRENCY_PAIRS.values() if s != symbol]
+            asyncio.get_running_loop().run_in_executor(None, MarketAnalyzer.fetch_batch, other_symbols)
+
             analyzer = MarketAnalyzer(symbol)
             analyzer.set_language(lang_code)
             analysis_result = analyzer.analyze_market()
@@ -264,14 +270,15 @@ async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
             result_message = format_signal_message(pair, analysis_result, lang_code)
 
             try:
-                create_analysis_image(analysis_result, market_data, lang_code)
-                with open('analysis_sample.png', 'rb') as photo:
-                    await query.message.reply_photo(
-                        photo=photo,
-                        caption=result_message,
-                        parse_mode='MarkdownV2',
-                        reply_markup=get_currency_keyboard(current_lang=lang_code)
-                    )
+                chart = create_analysis_image(analysis_result, market_data, lang_code, symbol=symbol)
+                if chart is None:
+                    raise RuntimeError("Chart generation failed")
+                await query.message.reply_photo(
+                    photo=InputFile(chart, filename='chart.png'),
+                    caption=result_message,
+                    parse_mode='MarkdownV2',
+                    reply_markup=get_currency_keyboard(current_lang=lang_code)
+                )
                 await analyzing_message.delete()
             except Exception as img_error:
                 logger.error(f"Chart error: {str(img_error)}")
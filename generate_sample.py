@@ -1,53 +1,107 @@
+import io
+import matplotlib
+matplotlib.use('Agg')  # Non-interactive backend, renders straight to a buffer
 import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import pandas as pd
 from datetime import datetime
+from collections import OrderedDict
 import os
+import threading
 
-def create_analysis_image(analysis_result, market_data, lang_code='tg'):
+CHART_CACHE_SIZE = 64
+_CHART_CACHE = OrderedDict()  # (symbol, last_timestamp, lang_code, data_points) -> PNG bytes
+# Held across the render too, so concurrent requests for one key only draw it once
+_CHART_CACHE_LOCK = threading.Lock()
+
+def create_analysis_image(analysis_result, market_data, lang_code='tg', symbol=None):
+    """Return the chart as PNG bytes (None on failure), reusing the last render while no new bar has arrived"""
+    if symbol is None:
+        return _render_analysis_image(market_data)
+
+    key = (symbol, market_data.index[-1].value, lang_code, len(market_data))
+    with _CHART_CACHE_LOCK:
+        png = _CHART_CACHE.get(key)
+        if png is not None:
+            _CHART_CACHE.move_to_end(key)
+            return png
+
+        png = _render_analysis_image(market_data)
+        if png is not None:
+            _CHART_CACHE[key] = png
+            if len(_CHART_CACHE) > CHART_CACHE_SIZE:
+                _CHART_CACHE.popitem(last=False)
+    return png
+
+def _create_figure():
+    """Build the chart figure and all its static styling once"""
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[3, 1])
+    fig.patch.set_facecolor('#1a1b26')
+
+    # Style the price plot
+    ax1.set_facecolor('#24283b')
+    ax1.grid(True, color='#414868', linestyle='--', alpha=0.3)
+    ax1.set_title('Price Analysis', color='white', pad=20)
+    ax1.tick_params(colors='white')
+
+    # Style the volume plot
+    ax2.set_facecolor('#24283b')
+    ax2.grid(True, color='#414868', linestyle='--', alpha=0.3)
+    ax2.set_title('Volume', color='white', pad=10)
+    ax2.tick_params(colors='white')
+
+    # Both plots share one time axis, so ticks are laid out once per render
+    ax2.sharex(ax1)
+    for ax in [ax1, ax2]:
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['bottom'].set_color('#414868')
+        ax.spines['left'].set_color('#414868')
+
+    return fig, (ax1, ax2)
+
+# Reused between renders, only the plotted data changes; the lock serializes access to it
+_FIG, (_AX1, _AX2) = _create_figure()
+_FIG_LOCK = threading.Lock()
+
+def _clear_data(ax):
+    for artist in list(ax.lines) + list(ax.patches) + list(ax.collections):
+        artist.remove()
+    ax.containers.clear()
+    ax.relim()
+
+def _render_analysis_image(market_data):
     try:
-        # Create figure with subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[3, 1])
-        fig.patch.set_facecolor('#1a1b26')
-        
-        # Plot price data
-        ax1.plot(market_data.index, market_data['Close'], label='Price', color='white', linewidth=2)
-        
-        # Calculate and plot moving averages
-        ema_7 = market_data['Close'].ewm(span=7, adjust=False).mean()
-        ema_21 = market_data['Close'].ewm(span=21, adjust=False).mean()
-        ax1.plot(market_data.index, ema_7, label='EMA 7', color='#00ff00', alpha=0.7)
-        ax1.plot(market_data.index, ema_21, label='EMA 21', color='#ff6b6b', alpha=0.7)
-        
-        # Plot volume
-        ax2.bar(market_data.index, market_data['Volume'], color='#4a9eff', alpha=0.3)
-        
-        # Style the price plot
-        ax1.set_facecolor('#24283b')
-        ax1.grid(True, color='#414868', linestyle='--', alpha=0.3)
-        ax1.set_title('Price Analysis', color='white', pad=20)
-        ax1.legend(facecolor='#24283b', edgecolor='#414868', labelcolor='white')
-        ax1.tick_params(colors='white')
-        
-        # Style the volume plot
-        ax2.set_facecolor('#24283b')
-        ax2.grid(True, color='#414868', linestyle='--', alpha=0.3)
-        ax2.set_title('Volume', color='white', pad=10)
-        ax2.tick_params(colors='white')
-        
-        # Format x-axis
-        for ax in [ax1, ax2]:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['bottom'].set_color('#414868')
-            ax.spines['left'].set_color('#414868')
-        
-        # Adjust layout and save
-        plt.tight_layout()
-        plt.savefig('analysis_sample.png', dpi=100, bbox_inches='tight', facecolor='#1a1b26')
-        plt.close()
-        
-        return True
+        with _FIG_LOCK:
+            _clear_data(_AX1)
+            _clear_data(_AX2)
+
+            # Plot price data
+            _AX1.plot(market_data.index, market_data['Close'], label='Price', color='white', linewidth=2)
+
+            # Calculate and plot moving averages
+            ema_7 = market_data['Close'].ewm(span=7, adjust=False).mean()
+            ema_21 = market_data['Close'].ewm(span=21, adjust=False).mean()
+            _AX1.plot(market_data.index, ema_7, label='EMA 7', color='#00ff00', alpha=0.7)
+            _AX1.plot(market_data.index, ema_21, label='EMA 21', color='#ff6b6b', alpha=0.7)
+            _AX1.legend(facecolor='#24283b', edgecolor='#414868', labelcolor='white')
+
+            # Plot volume, bar width in days to match the date axis
+            bar_step = (market_data.index[1] - market_data.index[0]) / pd.Timedelta(days=1) if len(market_data) > 1 else 1 / 1440
+            _AX2.bar(market_data.index, market_data['Volume'], width=bar_step * 0.8, color='#4a9eff', alpha=0.3)
+
+            # Fixed ticks instead of a date locator/formatter search; labels in UTC like matplotlib's default
+            ticks = pd.date_range(market_data.index[0], market_data.index[-1], periods=6)
+            labels = ticks.tz_convert('UTC') if ticks.tz is not None else ticks
+            _AX1.set_xticks(ticks)
+            _AX1.set_xticklabels([t.strftime('%H:%M') for t in labels])
+
+            # Adjust layout and render to memory (low compression: faster encode, slightly bigger file)
+            _FIG.tight_layout()
+            buf = io.BytesIO()
+            _FIG.savefig(buf, format='png', dpi=80, bbox_inches='tight', facecolor='#1a1b26',
+                         pil_kwargs={'compress_level': 1})
+
+        return buf.getvalue()
     except Exception as e:
         print(f"Error generating chart: {str(e)}")
-        return False
+        return None
@@ -1,11 +1,17 @@
 import os
 import time
+import socket
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, jsonify
 import psutil
 import requests
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
 
 app = Flask(__name__)
 logging.basicConfig(
@@ -18,22 +24,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reused across health checks so the TLS connection to Telegram stays alive
+http_session = requests.Session()
+check_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bot-check')
+
+# Sampled by monitor_once so the status page doesn't hit psutil/Telegram on every request
+BOOT_TIME = psutil.boot_time()
+metrics = {
+    'bot_status': "⏳ Checking bot status...",
+    'memory': psutil.Process().memory_info().rss / 1024 / 1024  # Convert to MB
+}
+
 def check_port_in_use(port):
-    """Check if port is already in use"""
+    """Check if port is already in use by trying to bind it"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        for conn in psutil.net_connections(kind='inet'):
-            if hasattr(conn.laddr, 'port') and conn.laddr.port == port:
-                return True
-    except Exception as e:
-        logger.error(f"Error checking port: {e}")
-    return False
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 0)
+        sock.bind(('0.0.0.0', port))
+        return False
+    except OSError:
+        return True
+    finally:
+        sock.close()
 
 def kill_process_on_port(port):
     """Kill process using specified port"""
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'connections']):
+        for proc in psutil.process_iter(['pid', 'net_connections']):
             try:
-                connections = proc.connections(kind='inet')
+                # Fetched by process_iter already; None when access was denied
+                connections = proc.info['net_connections'] or []
                 for conn in connections:
                     if hasattr(conn.laddr, 'port') and conn.laddr.port == port:
                         proc.terminate()
@@ -52,16 +72,8 @@ def health_check():
     logger.info("Health check request received")
     return jsonify({"status": "ok", "timestamp": datetime.now().isoformat()})
 
-@app.route('/')
-def home():
-    bot_pid = check_bot_process()
-    bot_health = check_bot_health() if bot_pid else False
-    status = "✅ Bot is running and healthy" if bot_health else "⚠️ Bot is running but not responding" if bot_pid else "❌ Bot is not running"
-
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    memory_usage = psutil.Process().memory_info().rss / 1024 / 1024  # Convert to MB
-
-    return f"""
+# Static page chrome, filled in per request with the latest sampled metrics
+HTML_TEMPLATE = """
     <html>
     <head>
         <meta charset="utf-8">
@@ -106,24 +118,33 @@ def home():
             </div>
             <div class="metric">
                 <span>Server Uptime:</span>
-                <span>{time.time() - psutil.boot_time():.0f} seconds</span>
+                <span>{uptime:.0f} seconds</span>
             </div>
             <div class="metric">
                 <span>Memory Usage:</span>
-                <span>{memory_usage:.1f} MB</span>
+                <span>{memory:.1f} MB</span>
             </div>
         </div>
     </body>
     </html>
     """
 
+@app.route('/')
+def home():
+    return HTML_TEMPLATE.format(
+        status=metrics['bot_status'],
+        current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        uptime=time.time() - BOOT_TIME,
+        memory=metrics['memory']
+    )
+
 def check_bot_process():
     """Check if the bot process is running"""
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+        for proc in psutil.process_iter(['cmdline']):
             try:
-                cmdline = ' '.join(proc.info['cmdline'] or [])
-                if 'python' in proc.info['name'].lower() and 'bot.py' in cmdline:
+                cmdline = proc.info['cmdline']
+                if cmdline and 'python' in cmdline[0].lower() and 'bot.py' in ' '.join(cmdline):
                     return proc.pid
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
@@ -139,38 +160,50 @@ def check_bot_health():
             logger.error("BOT_TOKEN not found in environment variables")
             return False
 
-        response = requests.get(f'https://api.telegram.org/bot{bot_token}/getMe', timeout=10)
+        response = http_session.get(f'https://api.telegram.org/bot{bot_token}/getMe', timeout=(2, 5))
         return response.status_code == 200
     except Exception as e:
         logger.error(f"Bot health check failed: {e}")
         return False
 
-def monitor_bot():
-    """Monitor bot health and restart if needed"""
-    while True:
-        try:
-            bot_pid = check_bot_process()
-            bot_healthy = check_bot_health() if bot_pid else False
-
-            if not bot_healthy:
-                logger.warning("Bot is not healthy, attempting to restart")
-                if bot_pid:
-                    try:
-                        proc = psutil.Process(bot_pid)
-                        proc.terminate()
-                        proc.wait(timeout=3)
-                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-                        pass
+MONITOR_INTERVAL = 60  # Seconds between bot health checks
 
-                # Start bot process
-                logger.info("Starting bot process...")
-                os.system('python bot.py &')
-                logger.info("Bot restarted")
+def monitor_once():
+    """Check bot health once and restart it if needed"""
+    try:
+        # The Telegram round trip overlaps the process scan running on this timer thread
+        health_future = check_executor.submit(check_bot_health)
+        bot_pid = check_bot_process()
+        bot_healthy = bool(health_future.result()) and bool(bot_pid)
+        metrics['bot_status'] = "✅ Bot is running and healthy" if bot_healthy else "⚠️ Bot is running but not responding" if bot_pid else "❌ Bot is not running"
+        metrics['memory'] = psutil.Process().memory_info().rss / 1024 / 1024  # Convert to MB
 
-            time.sleep(60)  # Check every minute
-        except Exception as e:
-            logger.error(f"Error in monitor thread: {e}")
-            time.sleep(60)
+        if not bot_healthy:
+            logger.warning("Bot is not healthy, attempting to restart")
+            if bot_pid:
+                try:
+                    proc = psutil.Process(bot_pid)
+                    proc.terminate()
+                    proc.wait(timeout=3)
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
+                    pass
+
+            # Start bot process
+            logger.info("Starting bot process...")
+            os.system('python bot.py &')
+            logger.info("Bot restarted")
+    except Exception as e:
+        logger.error(f"Error in monitor cycle: {e}")
+
+def schedule_monitor(delay=MONITOR_INTERVAL):
+    """Run monitor_once after `delay` seconds, then re-arm for the next cycle"""
+    def run_and_rearm():
+        monitor_once()
+        schedule_monitor()
+
+    timer = threading.Timer(delay, run_and_rearm)
+    timer.daemon = True
+    timer.start()
 
 def run():
     """Run the Flask server"""
@@ -181,7 +214,6 @@ def run():
     # Log network interfaces
     logger.info("Available network interfaces:")
     try:
-        import socket
         interfaces = socket.getaddrinfo(host=socket.gethostname(), port=None, family=socket.AF_INET)
         for interface in interfaces:
             logger.info(f"Interface: {interface}")
@@ -199,14 +231,19 @@ def run():
     for attempt in range(retries):
         try:
             logger.info(f"Starting Flask server on port {port} (attempt {attempt + 1})")
-            logger.info("About to call app.run()...")
 
-            app.run(
-                host='0.0.0.0',
-                port=port,
-                threaded=True,
-                debug=False
-            )
+            if serve is not None:
+                # Production WSGI server; runs fine in this background thread, unlike gunicorn
+                logger.info("About to call waitress serve()...")
+                serve(app, host='0.0.0.0', port=port, threads=8)
+            else:
+                logger.warning("waitress is not installed, falling back to the Flask development server")
+                app.run(
+                    host='0.0.0.0',
+                    port=port,
+                    threaded=True,
+                    debug=False
+                )
 
             logger.info("Flask server started successfully")
             return
@@ -220,7 +257,7 @@ def run():
                 raise
 
 def keep_alive():
-    """Start the Flask server and monitoring in background threads"""
+    """Start the Flask server in a background thread and schedule monitoring"""
     try:
         logger.info("Starting keep-alive server and monitoring")
 
@@ -229,10 +266,8 @@ def keep_alive():
         server_thread.daemon = True
         server_thread.start()
 
-        # Start the monitoring in another thread
-        monitor_thread = threading.Thread(target=monitor_bot)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        # First check right away, then every MONITOR_INTERVAL seconds
+        schedule_monitor(delay=0)
 
         logger.info("Keep-alive server and monitoring started successfully")
     except Exception as e:
@@ -1,49 +1,266 @@
 import logging
+import os
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
+import threading
+from functools import lru_cache
 from config import MESSAGES
 
 TIMEFRAMES = [1, 5, 15, 30]  # Reduced timeframes for faster response
+# One record per timeframe in analyze_market() results
+RESULT_DT = np.dtype([
+    ('tf', 'u1'),
+    ('signal', 'U8'),
+    ('change', 'f8'),
+    ('confidence', 'f8'),
+    ('rsi', 'f8'),
+    ('macd', 'f8'),
+    ('bb_position', 'U10')
+])
+
+MESSAGES_TG = MESSAGES['tg']['ERRORS']  # Default error messages
+
+@lru_cache(maxsize=16)
+def _errors(lang_code):
+    return MESSAGES[lang_code]['ERRORS']
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to DEBUG for more detailed logs
+# DEBUG gives per-timeframe detail; set MARKET_LOG_LEVEL=WARNING in production
+_log_level = os.getenv('MARKET_LOG_LEVEL', 'DEBUG').upper()
+if isinstance(logging.getLevelName(_log_level), int):
+    logger.setLevel(_log_level)
+else:
+    logger.setLevel(logging.DEBUG)
+    logger.warning(f"Unknown MARKET_LOG_LEVEL {_log_level!r}, using DEBUG")
+
+MARKET_DATA_TTL = 60  # Seconds a fetched frame is reused before hitting yfinance again
+_MKT_CACHE = {}  # symbol -> (fetched_at, DataFrame, interval); DataFrame is None if a batch had nothing usable
+_MKT_CACHE_LOCK = threading.Lock()
+_BATCH_LOCK = threading.Lock()  # One warm-up batch at a time
+
+def _is_cache_fresh(entry):
+    return entry is not None and time.time() - entry[0] < MARKET_DATA_TTL
+
+def _cached_market_data(symbol):
+    """Return (df, interval) fetched for symbol within the TTL, or (None, None)"""
+    with _MKT_CACHE_LOCK:
+        entry = _MKT_CACHE.get(symbol)
+    if _is_cache_fresh(entry) and entry[1] is not None:
+        logger.debug(f"Using cached market data for {symbol}")
+        return entry[1], entry[2]
+    return None, None
+
+def _store_market_data(symbol, df, interval):
+    with _MKT_CACHE_LOCK:
+        _MKT_CACHE[symbol] = (time.time(), df, interval)
+
+def _prepare_history(df, symbol):
+    """Normalize a yfinance history frame to OHLCV indexed by Datetime, None if columns are missing"""
+    # Add Volume column if missing (common for forex pairs)
+    if 'Volume' not in df.columns:
+        logger.info(f"Volume data not available for {symbol}, using placeholder values")
+        df['Volume'] = 1.0  # Use placeholder value for volume
+
+    required_columns = ['Open', 'High', 'Low', 'Close']
+    if not all(col in df.columns for col in required_columns):
+        logger.error(f"Missing required columns. Available: {df.columns}")
+        return None
+
+    # Ensure proper datetime handling
+    df = df.reset_index()
+    if 'Date' in df.columns:
+        df = df.rename(columns={'Date': 'Datetime'})
+    elif 'Datetime' not in df.columns and df.index.name == 'Datetime':
+        df = df.reset_index()
+
+    df.set_index('Datetime', inplace=True)
+    return df
+
+def timeframes_to_dict(records):
+    """Expand RESULT_DT records into the {minutes: {'signal', 'change', 'indicators'}} layout.
+    NaN RSI/MACD (not computed for that timeframe) are left out of the indicators."""
+    timeframes = {}
+    for rec in records:
+        indicators = {
+            'confidence': round(float(rec['confidence']), 1),
+            'expiration': int(rec['tf']),
+            'bb_position': str(rec['bb_position'])
+        }
+        for name in ('rsi', 'macd'):
+            if not np.isnan(rec[name]):
+                indicators[name] = float(rec[name])
+        timeframes[int(rec['tf'])] = {
+            'signal': str(rec['signal']),
+            'change': float(rec['change']),
+            'indicators': indicators
+        }
+    return timeframes
+
+def _wilder(values, period):
+    """Wilder's smoothing: seed with the mean of the first `period` values, then recurse"""
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    avg = out[period - 1] = values[:period].mean()
+    for i, value in enumerate(values[period:].tolist(), start=period):
+        avg = (avg * (period - 1) + value) / period
+        out[i] = avg
+    return out
+
+def _rsi(close, period=14):
+    """Wilder RSI aligned with close, NaN until there are `period` price changes"""
+    delta = np.diff(close)
+    avg_gain = _wilder(np.maximum(delta, 0), period)
+    avg_loss = _wilder(np.maximum(-delta, 0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    # diff() drops the first point
+    return np.concatenate(([np.nan], rsi))
+
+def _ema(values, period):
+    """EMA with pandas' ewm(span=period, adjust=False) semantics over a float ndarray"""
+    alpha = 2 / (period + 1)
+    out = np.empty(len(values))
+    if len(values) == 0:
+        return out
+    ema = out[0] = values[0]
+    for i, value in enumerate(values[1:].tolist(), start=1):
+        ema += alpha * (value - ema)
+        out[i] = ema
+    return out
+
+def _bollinger(close, period=20):
+    """Upper/lower bands at 2 sample std around the SMA, NaN until `period` points"""
+    upper = np.full(len(close), np.nan)
+    lower = np.full(len(close), np.nan)
+    if len(close) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period)
+        sma = windows.mean(axis=1)
+        std = windows.std(axis=1, ddof=1)
+        upper[period - 1:] = sma + std * 2
+        lower[period - 1:] = sma - std * 2
+    return upper, lower
+
+def _indicators_last(close, rsi_period=14, bb_period=20):
+    """Latest indicator values for analyze_timeframe, from the same helpers as calculate_*:
+    (ema_7, ema_21, rsi, macd, macd_prev, macd_signal, upper_band, lower_band)"""
+    macd = _ema(close, 12) - _ema(close, 26)
+    macd_signal = _ema(macd, 9)
+    macd_prev = macd[-2] if len(macd) > 1 else np.nan
+
+    # Only the last window matters for the bands
+    upper_band, lower_band = _bollinger(close[-bb_period:], bb_period)
+
+    return (_ema(close, 7)[-1], _ema(close, 21)[-1], _rsi(close, rsi_period)[-1],
+            macd[-1], macd_prev, macd_signal[-1], upper_band[-1], lower_band[-1])
 
 class MarketAnalyzer:
     def __init__(self, symbol):
         self.symbol = symbol
-        self.error_messages = MESSAGES['tg']['ERRORS']
+        self.error_messages = MESSAGES_TG
         logger.info(f"Initialized MarketAnalyzer for {symbol}")
 
     def set_language(self, lang_code):
-        self.error_messages = MESSAGES[lang_code]['ERRORS']
+        self.error_messages = _errors(lang_code)
         logger.info(f"Language set to {lang_code}")
 
     def calculate_ema(self, data, period):
-        return data.ewm(span=period, adjust=False).mean()
+        ema = _ema(np.asarray(data, dtype=float), period)
+        return pd.Series(ema, index=data.index) if isinstance(data, pd.Series) else ema
 
     def calculate_rsi(self, data, period=14):
-        delta = data.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        rsi = _rsi(np.asarray(data, dtype=float), period)
+        return pd.Series(rsi, index=data.index) if isinstance(data, pd.Series) else rsi
 
     def calculate_macd(self, data):
-        exp1 = data.ewm(span=12, adjust=False).mean()
-        exp2 = data.ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9, adjust=False).mean()
+        arr = np.asarray(data, dtype=float)
+        macd = _ema(arr, 12) - _ema(arr, 26)
+        signal = _ema(macd, 9)
+        if isinstance(data, pd.Series):
+            return pd.Series(macd, index=data.index), pd.Series(signal, index=data.index)
         return macd, signal
 
     def calculate_bollinger_bands(self, data, period=20):
-        sma = data.rolling(window=period).mean()
-        std = data.rolling(window=period).std()
-        upper_band = sma + (std * 2)
-        lower_band = sma - (std * 2)
+        upper_band, lower_band = _bollinger(np.asarray(data, dtype=float), period)
+        if isinstance(data, pd.Series):
+            return pd.Series(upper_band, index=data.index), pd.Series(lower_band, index=data.index)
         return upper_band, lower_band
 
+    @classmethod
+    def fetch_batch(cls, symbols):
+        """Fetch 1m history for several symbols with one yf.download call.
+
+        Meant to warm the market data cache off the request path. Symbols fetched
+        within the TTL are skipped, including ones that came back empty or short, and
+        the call returns at once if another batch is already running.
+        """
+        if not _BATCH_LOCK.acquire(blocking=False):
+            return {}
+        try:
+            return cls._fetch_batch(symbols)
+        finally:
+            _BATCH_LOCK.release()
+
+    @classmethod
+    def _fetch_batch(cls, symbols):
+        with _MKT_CACHE_LOCK:
+            symbols = [symbol for symbol in symbols if not _is_cache_fresh(_MKT_CACHE.get(symbol))]
+        if not symbols:
+            return {}
+
+        end_time = datetime.now()
+        start_time = end_time - timedelta(days=1)
+
+        try:
+            logger.debug(f"Batch fetching data for {len(symbols)} symbols")
+            data = yf.download(
+                ' '.join(symbols),
+                start=start_time,
+                end=end_time,
+                interval='1m',
+                group_by='ticker',
+                prepost=True,
+                progress=False
+            )
+        except Exception as e:
+            logger.error(f"Batch fetch failed: {str(e)}")
+            data = pd.DataFrame()
+
+        frames = {}
+        for symbol in symbols if not data.empty else []:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                df = data
+            # Symbols trade different hours, drop the rows that only exist for the others
+            df = df.dropna(how='all')
+            if df.empty:
+                logger.warning(f"Empty batch data for {symbol}")
+                continue
+
+            # Too few 1m bars for analyze_market, let get_market_data fall back to 5m itself
+            if len(df) < max(TIMEFRAMES) + 5:
+                continue
+
+            df = _prepare_history(df.copy(), symbol)
+            if df is not None:
+                _store_market_data(symbol, df, '1m')
+                frames[symbol] = df
+
+        # Remember the attempt for symbols without usable data so they aren't downloaded
+        # again within the TTL; get_market_data still fetches them on its own
+        for symbol in symbols:
+            if symbol not in frames:
+                _store_market_data(symbol, None, None)
+
+        logger.info(f"Batch fetched data for {len(frames)}/{len(symbols)} symbols")
+        return frames
+
     def get_market_data(self, minutes=30):
         try:
             end_time = datetime.now()
@@ -57,46 +274,47 @@ class MarketAnalyzer:
                     logger.debug(f"Attempt {attempt + 1}: Fetching data for {self.symbol}")
                     logger.debug(f"Time range: {start_time} to {end_time}")
 
-                    ticker = yf.Ticker(self.symbol)
-                    df = ticker.history(
-                        start=start_time,
-                        end=end_time,
-                        interval='5m',  # Use 5m interval for better availability
-                        prepost=True
-                    )
-
-                    logger.debug(f"Received data shape: {df.shape}")
-                    logger.debug(f"Available columns: {df.columns}")
-
-                    if df.empty:
-                        logger.warning(f"Empty DataFrame received for {self.symbol}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        return None, self.error_messages['NO_DATA']
-
-                    # Add Volume column if missing (common for forex pairs)
-                    if 'Volume' not in df.columns:
-                        logger.info(f"Volume data not available for {self.symbol}, using placeholder values")
-                        df['Volume'] = 1.0  # Use placeholder value for volume
-
-                    required_columns = ['Open', 'High', 'Low', 'Close']
-                    if not all(col in df.columns for col in required_columns):
-                        logger.error(f"Missing required columns. Available: {df.columns}")
-                        return None, self.error_messages['NO_DATA']
-
-                    # Ensure proper datetime handling
-                    df = df.reset_index()
-                    if 'Date' in df.columns:
-                        df = df.rename(columns={'Date': 'Datetime'})
-                    elif 'Datetime' not in df.columns and df.index.name == 'Datetime':
-                        df = df.reset_index()
-
-                    df.set_index('Datetime', inplace=True)
-
-                    # Convert to 1-minute data through interpolation
-                    df = df.resample('1min').interpolate(method='time')
-                    logger.debug(f"After resampling - shape: {df.shape}, columns: {df.columns}")
+                    # Retries always go to the network, the cached frame may be what fell short
+                    df, interval = _cached_market_data(self.symbol) if attempt == 0 else (None, None)
+                    if df is None:
+                        ticker = yf.Ticker(self.symbol)
+                        df = ticker.history(
+                            start=start_time,
+                            end=end_time,
+                            interval='1m',  # Native 1m bars, no interpolation needed
+                            prepost=True
+                        )
+                        interval = '1m'
+
+                        if len(df) < minutes:
+                            logger.debug(f"Only {len(df)} 1m bars for {self.symbol}, falling back to 5m")
+                            df = ticker.history(
+                                start=start_time,
+                                end=end_time,
+                                interval='5m',  # Use 5m interval for better availability
+                                prepost=True
+                            )
+                            interval = '5m'
+
+                        logger.debug(f"Received data shape: {df.shape}")
+                        logger.debug(f"Available columns: {df.columns}")
+
+                        if df.empty:
+                            logger.warning(f"Empty DataFrame received for {self.symbol}")
+                            if attempt < max_retries - 1:
+                                time.sleep(retry_delay * (attempt + 1))
+                                continue
+                            return None, self.error_messages['NO_DATA']
+
+                        df = _prepare_history(df, self.symbol)
+                        if df is None:
+                            return None, self.error_messages['NO_DATA']
+                        _store_market_data(self.symbol, df, interval)
+
+                    if interval == '5m':
+                        # Interpolate to 1-minute data, only over the bars that cover the window
+                        df = df.tail(minutes // 5 + 2).resample('1min').interpolate(method='time')
+                        logger.debug(f"After resampling - shape: {df.shape}, columns: {df.columns}")
 
                     data_points = len(df)
                     logger.info(f"Successfully fetched {data_points} data points for {self.symbol}")
@@ -122,7 +340,8 @@ class MarketAnalyzer:
             return None, self.error_messages['GENERAL_ERROR']
 
     def analyze_timeframe(self, df, minutes):
-        if df is None or len(df) < minutes:
+        # A single bar has no price change or MACD trend to vote on
+        if df is None or len(df) < minutes or minutes < 2:
             return 'NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, None
 
         try:
@@ -130,12 +349,9 @@ class MarketAnalyzer:
             close_prices = recent_data['Close']
             volume = recent_data['Volume']
 
-            # Technical Indicators
-            ema_7 = self.calculate_ema(close_prices, 7)
-            ema_21 = self.calculate_ema(close_prices, 21)
-            rsi = self.calculate_rsi(close_prices)
-            macd, macd_signal = self.calculate_macd(close_prices)
-            upper_band, lower_band = self.calculate_bollinger_bands(close_prices)
+            # Technical Indicators (seeded at the start of the slice, so each timeframe differs)
+            (ema_7, ema_21, last_rsi, last_macd, prev_macd, last_macd_signal,
+             last_upper_band, last_lower_band) = _indicators_last(close_prices.to_numpy(dtype=float))
 
             # Price Analysis
             start_price = close_prices.iloc[0]
@@ -153,36 +369,36 @@ class MarketAnalyzer:
                 0
             )
 
-            logger.info(f"Volume analysis - ratio: {volume_ratio:.2f}, strength: {volume_strength}")
+            logger.info("Volume analysis - ratio: %.2f, strength: %d", volume_ratio, volume_strength)
 
             # Signal Analysis
             trend_signals = []
 
             # EMA Signals
-            ema_diff_percent = ((ema_7.iloc[-1] - ema_21.iloc[-1]) / ema_21.iloc[-1]) * 100
+            ema_diff_percent = ((ema_7 - ema_21) / ema_21) * 100
             if ema_diff_percent > 0.05:  # Снизили порог с 0.1% до 0.05%
                 trend_signals.append(1)
             elif ema_diff_percent < -0.05:
                 trend_signals.append(-1)
 
-            logger.info(f"EMA analysis - diff: {ema_diff_percent:.2f}%")
+            logger.info("EMA analysis - diff: %.2f%%", ema_diff_percent)
 
-            # MACD Signal
-            macd_diff = macd.iloc[-1] - macd_signal.iloc[-1]
-            macd_trend = macd.iloc[-1] - macd.iloc[-2]  # Изменение MACD
-            if macd_diff > 0:
-                trend_signals.append(1)
-                if macd_trend > 0:  # Тренд MACD растет
+            # MACD Signal (needs at least two points for a trend)
+            if not np.isnan(prev_macd):
+                macd_diff = last_macd - last_macd_signal
+                macd_trend = last_macd - prev_macd  # Изменение MACD
+                if macd_diff > 0:
                     trend_signals.append(1)
-            else:
-                trend_signals.append(-1)
-                if macd_trend < 0:  # Тренд MACD падает
+                    if macd_trend > 0:  # Тренд MACD растет
+                        trend_signals.append(1)
+                else:
                     trend_signals.append(-1)
+                    if macd_trend < 0:  # Тренд MACD падает
+                        trend_signals.append(-1)
 
-            logger.info(f"MACD analysis - diff: {macd_diff:.4f}, trend: {macd_trend:.4f}")
+                logger.info("MACD analysis - diff: %.4f, trend: %.4f", macd_diff, macd_trend)
 
             # RSI Signals - усилили влияние RSI
-            last_rsi = rsi.iloc[-1]
             if last_rsi < 35:
                 trend_signals.extend([2, 1])  # Добавили дополнительный сигнал на покупку
             elif last_rsi > 65:
@@ -192,25 +408,25 @@ class MarketAnalyzer:
             elif last_rsi > 55:
                 trend_signals.append(-1)
 
-            logger.info(f"RSI analysis - value: {last_rsi:.1f}")
+            logger.info("RSI analysis - value: %.1f", last_rsi)
 
             # Bollinger Bands Signal
             current_price = close_prices.iloc[-1]
             bb_position = 'normal'
-            if current_price < lower_band.iloc[-1]:
+            if current_price < last_lower_band:
                 trend_signals.append(2)  # Strong buy signal
                 bb_position = 'oversold'
-            elif current_price > upper_band.iloc[-1]:
+            elif current_price > last_upper_band:
                 trend_signals.append(-2)  # Strong sell signal
                 bb_position = 'overbought'
 
-            logger.info(f"BB analysis - position: {bb_position}")
+            logger.info("BB analysis - position: %s", bb_position)
 
             # Calculate signal strength
             trend_strength = sum(trend_signals)
             trend_strength *= (1 + (volume_strength * 0.2))  # Volume impact
 
-            logger.info(f"Signal analysis - trend signals: {trend_signals}, final strength: {trend_strength:.2f}")
+            logger.info("Signal analysis - trend signals: %s, final strength: %.2f", trend_signals, trend_strength)
 
             # Signal determination
             confidence = 50 + (abs(trend_strength) * 5)  # Base confidence on strength
@@ -221,15 +437,17 @@ class MarketAnalyzer:
             else:
                 signal = 'NEUTRAL'
 
-            logger.info(f"Final signal: {signal} with confidence: {confidence:.1f}%")
+            logger.info("Final signal: %s with confidence: %.1f%%", signal, confidence)
 
             indicators = {
                 'confidence': round(confidence, 1),
                 'expiration': minutes,
-                'rsi': round(last_rsi, 2),
-                'macd': round(macd.iloc[-1], 4),
+                'macd': round(last_macd, 4),
                 'bb_position': bb_position
             }
+            # Too short a slice for RSI, leave it out of the message rather than print nan
+            if not np.isnan(last_rsi):
+                indicators['rsi'] = round(last_rsi, 2)
 
             return signal, price_change, indicators, None
 
@@ -251,21 +469,25 @@ class MarketAnalyzer:
                 return {'error': self.error_messages['NO_DATA']}
 
             current_price = df['Close'].iloc[-1]
-            timeframe_analysis = {}
+            timeframe_analysis = np.empty(len(TIMEFRAMES), dtype=RESULT_DT)
 
-            for minutes in TIMEFRAMES:
-                logger.debug(f"Analyzing {minutes}min timeframe for {self.symbol}")
+            for i, minutes in enumerate(TIMEFRAMES):
+                logger.debug("Analyzing %dmin timeframe for %s", minutes, self.symbol)
                 signal, change, indicators, error = self.analyze_timeframe(df, minutes)
 
                 if error:
                     logger.error(f"Error analyzing {minutes}min timeframe: {error}")
 
-                timeframe_analysis[minutes] = {
-                    'signal': signal,
-                    'change': change,
-                    'indicators': indicators
-                }
-                logger.debug(f"{minutes}min analysis complete - Signal: {signal}, Change: {change:.2f}%")
+                timeframe_analysis[i] = (
+                    minutes,
+                    signal,
+                    change,
+                    indicators['confidence'],
+                    indicators.get('rsi', np.nan),
+                    indicators.get('macd', np.nan),
+                    indicators.get('bb_position', 'normal')
+                )
+                logger.debug("%dmin analysis complete - Signal: %s, Change: %.2f%%", minutes, signal, change)
 
             return {
                 'current_price': current_price,
@@ -13,7 +13,8 @@ setup(
         'psycopg2-binary>=2.9.9',
         'Flask>=3.0.0',
         'Werkzeug>=3.0.1',
-        'psutil>=5.9.6',
+        'waitress>=3.0.0',
+        'psutil>=6.0.0',
         'requests>=2.31.0',
         'python-dotenv>=1.0.0',
         'matplotlib>=3.10.1',
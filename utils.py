@@ -1,6 +1,7 @@
 from datetime import datetime
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from config import CURRENCY_PAIRS, LANGUAGES, MESSAGES
+from market_analyzer import timeframes_to_dict
 
 def get_language_keyboard():
     keyboard = []
@@ -101,6 +102,8 @@ def format_signal_message(pair, analysis_result, lang_code='tg'):
 
     current_price = analysis_result.get('current_price')
     timeframes = analysis_result.get('timeframes', {})
+    if not isinstance(timeframes, dict):
+        timeframes = timeframes_to_dict(timeframes)
 
     result_parts = [
         f"💎 {messages['PAIR_HEADER'].format(escape_markdown(pair))}",
@@ -117,13 +120,22 @@ def format_signal_message(pair, analysis_result, lang_code='tg'):
         indicators = data.get('indicators', {})
         confidence = indicators.get('confidence', 50)
         expiration = indicators.get('expiration', minutes)
-        rsi = indicators.get('rsi', 0)
-        macd = indicators.get('macd', 0)
+        rsi = indicators.get('rsi')
+        macd = indicators.get('macd')
         bb_position = indicators.get('bb_position', 'normal')
 
         signal_text = messages['SIGNALS'][signal]
         bb_emoji = '↘️' if bb_position == 'oversold' else '↗️' if bb_position == 'overbought' else '↔️'
 
+        # RSI/MACD are missing when the timeframe is too short to compute them
+        indicator_lines = []
+        if rsi is not None:
+            indicator_lines.append(f"📉 RSI: `{rsi:.1f}`")
+        if macd is not None:
+            indicator_lines.append(f"📊 MACD: `{macd:.4f}`")
+        indicator_lines.append(f"{bb_emoji} BB: `{bb_position}`")
+        indicator_text = "\n".join(indicator_lines)
+
         timeframe_text = f"""
 📊 {escape_markdown(messages['TIMEFRAME'].format(minutes))}
 {signal_text}
@@ -132,9 +144,7 @@ def format_signal_message(pair, analysis_result, lang_code='tg'):
 ⏰ {escape_markdown(messages['EXPIRATION'])}: `{expiration} {escape_markdown(messages['MINUTES'])}`
 📈 {escape_markdown(messages['CONFIDENCE'])}: `{confidence}%`
 
-📉 RSI: `{rsi:.1f}`
-📊 MACD: `{macd:.4f}`
-{bb_emoji} BB: `{bb_position}`
+{indicator_text}
 """
         result_parts.append(timeframe_text)
 